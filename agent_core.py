@@ -1,7 +1,10 @@
 # agent_core.py
 import pandas as pd
 import numpy as np
-import json, os, math
+import json, os, io, re, math, hashlib, gzip, bz2, sqlite3
+from collections import deque, OrderedDict
+from contextlib import closing
+from concurrent.futures import ProcessPoolExecutor
 from sklearn.cluster import KMeans
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
@@ -9,10 +12,33 @@ from sklearn.impute import SimpleImputer
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 OUTPUT_DIR = "outputs"
 MEMORY_FILE = "memory.json"
+MEMORY_INDEX = "memory_index.sqlite"
+PROFILE_DIR = os.path.join(OUTPUT_DIR, "profiles")
+PROFILE_VERSION = 2
+DATA_DIR = os.environ.get("EDA_DATA_DIR", "data")
+DATA_EXTENSIONS = (".csv", ".csv.gz", ".csv.bz2", ".csv.zst", ".gz", ".bz2", ".zst")
+CHUNK_BYTES = 32 * 1024 * 1024
+# raw CSV bytes handed to workers at any time, independent of the core count
+MAX_INFLIGHT_BYTES = 256 * 1024 * 1024
+# categorical columns with more rows than this and a mostly distinct head
+# sample are profiled with sketches instead of an exact dictionary
+APPROX_MIN_ROWS = 1_000_000
+APPROX_SAMPLE = 10_000
+HEAVY_HITTER_CAPACITY = 1000
+HLL_PRECISION = 14
+SKETCH_SLICE = 250_000
+FEATURE_CACHE_SIZE = 2
+TIME_INDEX_CACHE_SIZE = 2
+MAX_TIME_BUCKETS = 1000
 os.makedirs(OUTPUT_DIR, exist_ok=True)
+os.makedirs(PROFILE_DIR, exist_ok=True)
 
 # --- Memory helpers ---
 def load_memory():
@@ -25,22 +51,368 @@ def save_memory(mem):
     with open(MEMORY_FILE, "w", encoding="utf-8") as f:
         json.dump(mem, f, indent=2, ensure_ascii=False)
 
-def add_memory_entry(question, summary, artifacts=[]):
+def add_memory_entry(question, summary, artifacts=[], dataset=None, intent=None):
+    con = open_memory_index()
     mem = load_memory()
     entry = {"timestamp": datetime.utcnow().isoformat()+"Z",
              "question": question,
              "summary": summary,
-             "artifacts": artifacts}
+             "artifacts": artifacts,
+             "dataset": dataset,
+             "type": intent}
     mem["analyses"].append(entry)
     save_memory(mem)
+    with closing(con), con:
+        _index_entries(con, [entry])
+        _mark_index_synced(con)
+
+def clear_memory():
+    save_memory({"analyses": []})
+    open_memory_index().close()
+
+# --- Memory index ---
+# memory.json stays the record of analyses; MEMORY_INDEX is a SQLite copy with
+# a full-text index over question/summary and indexes on dataset, type and
+# timestamp. It is rebuilt whenever memory.json changes outside these helpers.
+def _memory_file_state():
+    if not os.path.exists(MEMORY_FILE):
+        return ""
+    st = os.stat(MEMORY_FILE)
+    return f"{st.st_mtime_ns}:{st.st_size}"
+
+def _mark_index_synced(con):
+    con.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('memory_state', ?)", (_memory_file_state(),))
+
+def _index_entries(con, entries):
+    for e in entries:
+        cur = con.execute(
+            "INSERT INTO analyses (timestamp, dataset, type, question, summary, artifacts) VALUES (?, ?, ?, ?, ?, ?)",
+            (e["timestamp"], e.get("dataset"), e.get("type"), e["question"], e["summary"], json.dumps(e.get("artifacts", []))))
+        con.execute("INSERT INTO analyses_fts (rowid, question, summary) VALUES (?, ?, ?)",
+                    (cur.lastrowid, e["question"], e["summary"]))
+
+def open_memory_index():
+    con = sqlite3.connect(MEMORY_INDEX)
+    con.row_factory = sqlite3.Row
+    con.executescript("""
+        CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE IF NOT EXISTS analyses (
+            id INTEGER PRIMARY KEY, timestamp TEXT, dataset TEXT, type TEXT,
+            question TEXT, summary TEXT, artifacts TEXT);
+        CREATE INDEX IF NOT EXISTS analyses_dataset ON analyses (dataset, timestamp);
+        CREATE INDEX IF NOT EXISTS analyses_type ON analyses (type, timestamp);
+        CREATE INDEX IF NOT EXISTS analyses_timestamp ON analyses (timestamp);
+        CREATE VIRTUAL TABLE IF NOT EXISTS analyses_fts USING fts5 (question, summary);
+    """)
+    row = con.execute("SELECT value FROM meta WHERE key = 'memory_state'").fetchone()
+    if row is None or row["value"] != _memory_file_state():
+        with con:
+            con.execute("DELETE FROM analyses")
+            con.execute("DELETE FROM analyses_fts")
+            _index_entries(con, load_memory()["analyses"])
+            _mark_index_synced(con)
+    return con
+
+def _fts_query(text):
+    return " ".join('"' + t.replace('"', '""') + '"' for t in text.split())
+
+def _memory_filter(dataset=None, intent=None, text=None):
+    clauses, params = [], []
+    if dataset is not None:
+        clauses.append("a.dataset = ?")
+        params.append(dataset)
+    if intent is not None:
+        clauses.append("a.type = ?")
+        params.append(intent)
+    if text and text.strip():
+        clauses.append("a.id IN (SELECT rowid FROM analyses_fts WHERE analyses_fts MATCH ?)")
+        params.append(_fts_query(text))
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+def _row_to_entry(row):
+    return {"timestamp": row["timestamp"], "question": row["question"], "summary": row["summary"],
+            "artifacts": json.loads(row["artifacts"]), "dataset": row["dataset"], "type": row["type"]}
+
+def search_memory(dataset=None, intent=None, text=None, limit=10, offset=0):
+    where, params = _memory_filter(dataset, intent, text)
+    with closing(open_memory_index()) as con:
+        rows = con.execute(f"SELECT a.* FROM analyses a {where} ORDER BY a.timestamp DESC, a.id DESC LIMIT ? OFFSET ?",
+                           params + [limit, offset]).fetchall()
+    return [_row_to_entry(r) for r in rows]
+
+def count_memory(dataset=None, intent=None, text=None):
+    where, params = _memory_filter(dataset, intent, text)
+    with closing(open_memory_index()) as con:
+        return con.execute(f"SELECT COUNT(*) FROM analyses a {where}", params).fetchone()[0]
+
+def memory_intents(dataset=None):
+    where, params = _memory_filter(dataset)
+    with closing(open_memory_index()) as con:
+        rows = con.execute(f"SELECT DISTINCT a.type FROM analyses a {where} ORDER BY a.type", params).fetchall()
+    return [r[0] for r in rows if r[0] is not None]
+
+def conclusion_entries(dataset, limit=5):
+    # latest entry of each intent for the dataset, most recent first; SQLite
+    # fills the bare a.* columns from the row holding MAX(timestamp).
+    # Untyped entries (written before intents were recorded) are skipped.
+    with closing(open_memory_index()) as con:
+        rows = con.execute("""
+            SELECT a.*, MAX(a.timestamp) FROM analyses a
+            WHERE a.dataset = ? AND a.type IS NOT NULL AND a.type NOT IN ('basic', 'conclusion')
+            GROUP BY a.type ORDER BY a.timestamp DESC LIMIT ?""", (dataset, limit)).fetchall()
+    return [_row_to_entry(r) for r in rows]
 
 # --- Loading ---
-def load_csv(path_or_buffer, nrows=None):
-    df = pd.read_csv(path_or_buffer, nrows=nrows)
-    return df
+# CSVs are read as a stream: the (optionally compressed) source is cut into
+# blocks of whole rows and each block is parsed in a worker process, so the
+# raw file is never held in memory at once.
+def list_data_files():
+    if not os.path.isdir(DATA_DIR):
+        return []
+    return sorted(f for f in os.listdir(DATA_DIR)
+                  if f.lower().endswith(DATA_EXTENSIONS) and os.path.isfile(os.path.join(DATA_DIR, f)))
+
+def resolve_data_file(name):
+    root = os.path.realpath(DATA_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise ValueError(f"File {name!r} is not available in {DATA_DIR}.")
+    return path
+
+def detect_compression(raw):
+    pos = raw.tell()
+    magic = raw.read(4)
+    raw.seek(pos)
+    if magic[:2] == b"\x1f\x8b":
+        return "gzip"
+    if magic[:3] == b"BZh":
+        return "bz2"
+    if magic == b"\x28\xb5\x2f\xfd":
+        return "zstd"
+    return None
+
+def open_csv_stream(raw):
+    compression = detect_compression(raw)
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if compression == "bz2":
+        return bz2.BZ2File(raw, mode="rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise ImportError("Reading .zst files requires the 'zstandard' package.")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw))
+    return raw
+
+def _read_rows(stream, block=b""):
+    # complete the last row; an odd number of quotes means the cut fell inside
+    # a quoted field ("" escapes count twice), so keep reading lines
+    if block and not block.endswith(b"\n"):
+        block += stream.readline()
+    while block.count(b'"') % 2:
+        line = stream.readline()
+        if not line:
+            break
+        block += line
+    return block
+
+def iter_row_blocks(stream, chunk_bytes=CHUNK_BYTES):
+    # cut on row ends, never inside a quoted field that spans several lines
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            break
+        yield _read_rows(stream, block)
+
+def _parse_csv_block(header, block, dtype=None):
+    df = pd.read_csv(io.BytesIO(header + block), dtype=dtype)
+    # columns travel separately so the parent can free them one at a time
+    return {c: df[c] for c in df.columns}
+
+def _column_kind(s):
+    # True/False blocks with blanks come back as object; still booleans
+    if pd.api.types.is_bool_dtype(s) or pd.api.types.infer_dtype(s, skipna=True) == "boolean":
+        return "bool"
+    return "numeric" if pd.api.types.is_numeric_dtype(s) else "text"
+
+def _mixed_kind_columns(parts):
+    # columns parsed as different kinds (bool, numbers, text) across blocks
+    mixed = []
+    for c in parts[0]:
+        kinds = {_column_kind(p[c]) for p in parts if p[c].notna().any()}
+        if len(kinds) > 1:
+            mixed.append(c)
+    return mixed
+
+def _merge_blocks(parts):
+    # concatenated column by column, dropping each block's piece once merged,
+    # so peak memory stays near one parsed frame plus one column
+    data = {}
+    for c in list(parts[0]):
+        data[c] = pd.concat([p.pop(c) for p in parts], ignore_index=True)
+    return pd.DataFrame(data, copy=False)
+
+def load_csv(path_or_buffer, nrows=None, progress=None, workers=None, chunk_bytes=CHUNK_BYTES, dtype=None):
+    raw = open(path_or_buffer, "rb") if isinstance(path_or_buffer, (str, os.PathLike)) else path_or_buffer
+    try:
+        raw.seek(0, os.SEEK_END)
+        total = raw.tell()
+        raw.seek(0)
+        stream = open_csv_stream(raw)
+        if nrows is not None:
+            return pd.read_csv(stream, nrows=nrows, dtype=dtype)
+        header = _read_rows(stream, stream.readline())
+        parts, pending, pool, inflight = [], deque(), None, 0
+        workers = workers or os.cpu_count() or 1
+        try:
+            for block in iter_row_blocks(stream, chunk_bytes):
+                if pool is None and workers > 1 and len(block) >= chunk_bytes:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                if pool is None:
+                    parts.append(_parse_csv_block(header, block, dtype))
+                else:
+                    while pending and inflight + len(block) > MAX_INFLIGHT_BYTES:
+                        size, future = pending.popleft()
+                        parts.append(future.result())
+                        inflight -= size
+                    pending.append((len(block), pool.submit(_parse_csv_block, header, block, dtype)))
+                    inflight += len(block)
+                block = None
+                if progress:
+                    progress(raw.tell() / total if total else 1.0)
+            while pending:
+                parts.append(pending.popleft()[1].result())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        if not parts:
+            return pd.read_csv(io.BytesIO(header), dtype=dtype)
+        mixed = _mixed_kind_columns(parts)
+        if mixed:
+            # blocks guessed different types; read again with those columns as
+            # text, as a single pd.read_csv would have typed them
+            parts = None
+            raw.seek(0)
+            dtype = {**(dtype or {}), **{c: str for c in mixed}}
+            return load_csv(raw, progress=progress, workers=workers, chunk_bytes=chunk_bytes, dtype=dtype)
+        df = _merge_blocks(parts)
+        if progress:
+            progress(1.0)
+        return df
+    finally:
+        if raw is not path_or_buffer:
+            raw.close()
+
+# --- Categorical profiling ---
+# Each non-numeric column is encoded once (pd.factorize) and every summary is
+# read from the integer codes. Very high-cardinality columns are hashed once
+# slice by slice instead and summarised with a HyperLogLog distinct count and
+# a Misra-Gries heavy-hitter sketch.
+def _to_python(value):
+    return value.item() if hasattr(value, "item") else value
+
+def _encoded_summary(s, top_k):
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    valid = codes >= 0
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    top = np.argsort(-counts, kind="stable")[:top_k]
+    return {
+        "count": int(valid.sum()),
+        "n_unique": int(len(uniques)),
+        "top": _to_python(uniques[top[0]]) if len(top) else None,
+        "freq_top": int(counts[top[0]]) if len(top) else 0,
+        "n_missing": int(len(codes) - valid.sum()),
+        "top_k": [[_to_python(uniques[i]), int(counts[i])] for i in top],
+        "approximate": False,
+    }, [_to_python(v) for v in uniques[:3]]
+
+def hll_update(registers, hashes, p=HLL_PRECISION):
+    idx = (hashes >> np.uint64(64 - p)).astype(np.int64)
+    rest = (hashes & np.uint64((1 << (64 - p)) - 1)).astype(np.float64)  # < 2**50, exact in float64
+    rank = (64 - p) - np.frexp(rest)[1] + 1
+    np.maximum.at(registers, idx, rank)
+
+def hll_estimate(registers):
+    m = len(registers)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int((registers == 0).sum())
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * math.log(m / zeros)
+    return int(round(estimate))
+
+def hll_distinct_count(hashes, p=HLL_PRECISION):
+    registers = np.zeros(1 << p, dtype=np.int64)
+    hll_update(registers, hashes, p)
+    return hll_estimate(registers)
+
+def misra_gries_update(summary, hashes, positions, capacity=HEAVY_HITTER_CAPACITY):
+    # summary: DataFrame indexed by hash with a lower-bound "count" and the
+    # "pos" of the first occurrence; every value seen more than
+    # n/(capacity+1) times stays in it
+    codes, uniques = pd.factorize(hashes)
+    first = np.empty(len(uniques), dtype=np.int64)
+    first[codes[::-1]] = positions[::-1]
+    part = pd.DataFrame({"count": np.bincount(codes, minlength=len(uniques)), "pos": first}, index=uniques)
+    if summary is not None:
+        part = pd.concat([summary, part]).groupby(level=0).agg({"count": "sum", "pos": "min"})
+    if len(part) > capacity:
+        cut = part["count"].nlargest(capacity + 1).iloc[-1]
+        part = part[part["count"] > cut]
+        part = part.assign(count=part["count"] - cut)
+    return part
+
+def misra_gries(hashes, capacity=HEAVY_HITTER_CAPACITY, chunk=SKETCH_SLICE):
+    summary = None
+    for start in range(0, len(hashes), chunk):
+        h = hashes[start:start+chunk]
+        summary = misra_gries_update(summary, h, np.arange(start, start + len(h)), capacity)
+    return summary
+
+def _sketch_summary(s, top_k):
+    # one hashing pass over fixed-size slices; memory is bounded by the slice
+    # and the sketches, not by the column
+    registers = np.zeros(1 << HLL_PRECISION, dtype=np.int64)
+    summary, count = None, 0
+    for start in range(0, len(s), SKETCH_SLICE):
+        part = s.iloc[start:start+SKETCH_SLICE]
+        valid = part.notna().to_numpy()
+        if not valid.any():
+            continue
+        hashes = pd.util.hash_array(part.to_numpy()[valid], categorize=False)
+        hll_update(registers, hashes)
+        summary = misra_gries_update(summary, hashes, start + np.flatnonzero(valid))
+        count += int(valid.sum())
+    top = summary.sort_values("count", ascending=False, kind="stable").head(top_k) if summary is not None else pd.DataFrame({"count": [], "pos": []})
+    top_values = [_to_python(v) for v in s.iloc[top["pos"].to_numpy(dtype=np.int64)]]
+    top_counts = [int(c) for c in top["count"]]
+    return {
+        "count": count,
+        "n_unique": hll_estimate(registers),
+        "top": top_values[0] if top_values else None,
+        "freq_top": top_counts[0] if top_counts else 0,
+        "n_missing": int(len(s) - count),
+        # counts are Misra-Gries lower bounds, short by at most count/(capacity+1)
+        "top_k": [[v, c] for v, c in zip(top_values, top_counts)],
+        "approximate": True,
+    }, [_to_python(v) for v in pd.unique(s.iloc[:APPROX_SAMPLE].dropna().to_numpy())[:3]]
+
+def categorical_summary(s, top_k=10):
+    # returns (stats, first three distinct values)
+    if len(s) > APPROX_MIN_ROWS:
+        head = s.iloc[:APPROX_SAMPLE].dropna()
+        if len(head) and head.nunique() > len(head) / 2:
+            return _sketch_summary(s, top_k)
+    return _encoded_summary(s, top_k)
+
+def categorical_summaries(df):
+    return {c: categorical_summary(df[c]) for c in df.columns
+            if not pd.api.types.is_numeric_dtype(df[c]) and not pd.api.types.is_datetime64_any_dtype(df[c])}
 
 # --- Type detection ---
-def detect_column_types(df):
+def detect_column_types(df, categorical=None):
+    if categorical is None:
+        categorical = categorical_summaries(df)
     types = {}
     for col in df.columns:
         s = df[col]
@@ -49,26 +421,30 @@ def detect_column_types(df):
         elif pd.api.types.is_datetime64_any_dtype(s):
             types[col] = "datetime"
         else:
+            summary, first_values = categorical[col]
             # try date parse
             try:
-                pd.to_datetime(s.dropna().unique()[:3])
+                pd.to_datetime(first_values)
                 types[col] = "datetime"
             except Exception:
                 # low cardinality -> categorical
-                if s.nunique(dropna=True) < min(50, len(s)/2):
+                if summary["n_unique"] < min(50, len(s)/2):
                     types[col] = "categorical"
                 else:
                     types[col] = "text"
     return types
 
 # --- Descriptive stats ---
-def descriptive_stats(df, cols=None):
+def descriptive_stats(df, cols=None, categorical=None):
     if cols is None:
         cols = df.columns.tolist()
     stats = {}
     for col in cols:
         s = df[col]
         if pd.api.types.is_numeric_dtype(s):
+            if pd.api.types.is_bool_dtype(s):
+                # True/False as 1/0, as df.describe() on a numeric frame
+                s = s.astype(float)
             stats[col] = {
                 "count": int(s.count()),
                 "mean": float(np.nanmean(s)),
@@ -83,14 +459,10 @@ def descriptive_stats(df, cols=None):
                 "n_unique": int(s.nunique(dropna=True)),
                 "n_missing": int(s.isna().sum())
             }
+        elif categorical is not None and col in categorical:
+            stats[col] = categorical[col][0]
         else:
-            stats[col] = {
-                "count": int(s.count()),
-                "n_unique": int(s.nunique(dropna=True)),
-                "top": s.value_counts(dropna=True).idxmax() if s.nunique(dropna=True)>0 else None,
-                "freq_top": int(s.value_counts(dropna=True).max()) if s.nunique(dropna=True)>0 else 0,
-                "n_missing": int(s.isna().sum())
-            }
+            stats[col] = categorical_summary(s)[0]
     return stats
 
 # --- Plots ---
@@ -118,8 +490,22 @@ def plot_boxplot(df, column, save_as=None):
     else:
         return plt
 
-def plot_correlation_heatmap(df, numeric_cols, save_as=None):
-    corr = df[numeric_cols].corr()
+def plot_histogram_bins(hist, column, save_as=None):
+    # same figure as plot_histogram, drawn from precomputed profile bins
+    plt.figure(figsize=(8,4))
+    plt.stairs(hist["counts"], hist["edges"], fill=True, alpha=0.6)
+    plt.title(f"Histogram of {column}")
+    plt.tight_layout()
+    if save_as:
+        plt.savefig(save_as)
+        plt.close()
+        return save_as
+    else:
+        return plt
+
+def plot_correlation_heatmap(df, numeric_cols, save_as=None, corr=None):
+    if corr is None:
+        corr = correlation_matrix(df, numeric_cols)
     plt.figure(figsize=(10,8))
     sns.heatmap(corr, annot=False, cmap="coolwarm", vmin=-1, vmax=1)
     plt.title("Correlation heatmap")
@@ -139,19 +525,68 @@ def plot_scatter_matrix(df, columns, save_as=None):
         return save_as
     return plt
 
+# --- Feature matrix ---
+# Models and correlations share one C-contiguous numeric matrix per dataset,
+# filled column by column (no intermediate float64 frame). Matrices are kept
+# in a small LRU cache keyed by the dataset fingerprint and the build options;
+# without a fingerprint nothing is cached, so a frame changed in place is
+# never served a stale matrix.
+_feature_cache = OrderedDict()
+
+def feature_matrix(df, numeric_cols, dtype=np.float32, standardize=False, missing="zero", fingerprint=None):
+    # missing: "zero" (fillna(0)), "mean"/"median" (SimpleImputer) or None (keep NaN)
+    key = (fingerprint, tuple(numeric_cols), np.dtype(dtype).str, standardize, missing)
+    if fingerprint is not None and key in _feature_cache:
+        _feature_cache.move_to_end(key)
+        return _feature_cache[key]
+    X = np.empty((len(df), len(numeric_cols)), dtype=dtype, order="C")
+    fill = 0 if missing == "zero" else np.nan
+    for j, c in enumerate(numeric_cols):
+        X[:, j] = df[c].to_numpy(dtype=dtype, na_value=fill)
+    if missing in ("mean", "median"):
+        X = SimpleImputer(strategy=missing, copy=False, keep_empty_features=True).fit_transform(X)
+    elif missing not in ("zero", None):
+        raise ValueError(f"Unknown missing value strategy: {missing!r}")
+    if standardize:
+        X = StandardScaler(copy=False).fit_transform(X)
+    X = np.ascontiguousarray(X)
+    X.setflags(write=False)
+    if fingerprint is not None:
+        _feature_cache[key] = X
+        while len(_feature_cache) > FEATURE_CACHE_SIZE:
+            _feature_cache.popitem(last=False)
+    return X
+
+def correlation_matrix(df, numeric_cols):
+    # checked column by column, without building a frame or a boolean matrix
+    if any(df[c].hasnans for c in numeric_cols):
+        # pairwise-complete correlation, as DataFrame.corr
+        return df[numeric_cols].corr()
+    Xs = feature_matrix(df, numeric_cols, dtype=np.float64, standardize=True, missing=None)
+    corr = (Xs.T @ Xs) / len(Xs)
+    # constants on the raw values: standardizing leaves rounding residues
+    constant = np.array([len(df) == 0 or df[c].min() == df[c].max() for c in numeric_cols], dtype=bool)
+    corr[constant, :] = np.nan
+    corr[:, constant] = np.nan
+    np.fill_diagonal(corr, np.where(constant, np.nan, 1.0))
+    return pd.DataFrame(corr, index=numeric_cols, columns=numeric_cols)
+
 # --- Outlier detection ---
-def detect_outliers_iqr(series):
-    q1 = series.quantile(0.25)
-    q3 = series.quantile(0.75)
+def detect_outliers_iqr(series, q1=None, q3=None):
+    # q1/q3 may come from the dataset profile to skip recomputing quartiles
+    if q1 is None:
+        q1 = series.quantile(0.25)
+    if q3 is None:
+        q3 = series.quantile(0.75)
     iqr = q3 - q1
     low = q1 - 1.5*iqr
     high = q3 + 1.5*iqr
     out_mask = (series < low) | (series > high)
     return out_mask, {"low": float(low), "high": float(high)}
 
-def detect_outliers_isolationforest(df, numeric_cols, contamination=0.01):
+def detect_outliers_isolationforest(df, numeric_cols, contamination=0.01, missing="zero", fingerprint=None):
     iso = IsolationForest(contamination=contamination, random_state=42)
-    X = df[numeric_cols].fillna(0)
+    X = feature_matrix(df, numeric_cols, missing=missing, fingerprint=fingerprint)
     iso.fit(X)
     preds = iso.predict(X)
     # -1 -> outlier, 1 -> inlier
@@ -159,10 +594,8 @@ def detect_outliers_isolationforest(df, numeric_cols, contamination=0.01):
     return mask
 
 # --- Clustering ---
-def run_kmeans(df, numeric_cols, n_clusters=3):
-    X = df[numeric_cols].fillna(0)
-    scaler = StandardScaler()
-    Xs = scaler.fit_transform(X)
+def run_kmeans(df, numeric_cols, n_clusters=3, missing="zero", fingerprint=None):
+    Xs = feature_matrix(df, numeric_cols, standardize=True, missing=missing, fingerprint=fingerprint)
     k = KMeans(n_clusters=n_clusters, random_state=42)
     labels = k.fit_predict(Xs)
     return labels, k
@@ -172,115 +605,382 @@ def correlation_with_target(df, target_col):
     numeric = df.select_dtypes(include=[np.number]).columns.tolist()
     if target_col not in numeric:
         return None
-    corrs = {}
-    for c in numeric:
-        if c==target_col: continue
-        try:
-            corrs[c] = float(df[c].corr(df[target_col]))
-        except:
-            corrs[c] = None
+    corr = correlation_matrix(df, numeric)[target_col]
+    corrs = {c: (None if pd.isna(v) else float(v)) for c, v in corr.items() if c != target_col}
     # sort by absolute correlation
     sorted_corr = sorted(corrs.items(), key=lambda x: abs(x[1]) if x[1] is not None else 0, reverse=True)
     return sorted_corr
 
+# --- Dataset profile ---
+# One profiling pass per dataset; the result is saved as JSON under
+# PROFILE_DIR, named after the dataset fingerprint, and read by every
+# tab of the app and every intent of answer_question.
+def dataset_fingerprint(df):
+    h = hashlib.sha1()
+    h.update(json.dumps([str(c) for c in df.columns]).encode("utf-8"))
+    h.update(json.dumps([str(t) for t in df.dtypes]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return h.hexdigest()
+
+def find_target_column(columns, keywords=("class", "fraud")):
+    candidates = [c for c in columns if any(k in str(c).lower() for k in keywords)]
+    return candidates[0] if candidates else None
+
+def histogram_bins(series, bins=50):
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return None
+    counts, edges = np.histogram(values, bins=bins)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+def class_balance(df, target):
+    counts = df[target].value_counts()
+    total = len(df)
+    return {"column": target,
+            "counts": {str(k): int(v) for k, v in counts.items()},
+            "proportions": {str(k): float(v / total * 100) for k, v in counts.items()},
+            "total": int(total)}
+
+def build_profile(df, fingerprint=None):
+    categorical = categorical_summaries(df)
+    types = detect_column_types(df, categorical)
+    numeric_cols = [c for c,t in types.items() if t=="numeric"]
+    target = find_target_column(df.columns)
+    corr = correlation_matrix(df, numeric_cols) if numeric_cols else pd.DataFrame()
+    return {
+        "version": PROFILE_VERSION,
+        "fingerprint": fingerprint or dataset_fingerprint(df),
+        "created": datetime.utcnow().isoformat()+"Z",
+        "rows": int(len(df)),
+        "columns": [str(c) for c in df.columns],
+        "types": types,
+        "stats": descriptive_stats(df, categorical=categorical),
+        "histograms": {c: histogram_bins(df[c]) for c in numeric_cols},
+        "correlation": {"columns": numeric_cols, "matrix": corr.values.tolist()},
+        "class_balance": class_balance(df, target) if target is not None else None,
+    }
+
+def profile_path(fingerprint):
+    return os.path.join(PROFILE_DIR, f"{fingerprint}.json")
+
+def load_profile(fingerprint):
+    path = profile_path(fingerprint)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    if profile.get("version") != PROFILE_VERSION:
+        return None
+    return profile
+
+def save_profile(profile):
+    with open(profile_path(profile["fingerprint"]), "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, default=str)
+
+def get_profile(df):
+    fingerprint = dataset_fingerprint(df)
+    profile = load_profile(fingerprint)
+    if profile is None:
+        profile = build_profile(df, fingerprint)
+        save_profile(profile)
+    return profile
+
+def profile_numeric_cols(profile):
+    return [c for c,t in profile["types"].items() if t=="numeric"]
+
+def profile_correlation(profile):
+    corr = profile["correlation"]
+    return pd.DataFrame(corr["matrix"], index=corr["columns"], columns=corr["columns"], dtype=float)
+
+def profile_describe(profile):
+    # same layout as df.describe() for the numeric columns
+    rows = ["count", "mean", "std", "min", "25%", "50%", "75%", "max"]
+    cols = profile_numeric_cols(profile)
+    return pd.DataFrame({c: [profile["stats"][c][r] for r in rows] for c in cols}, index=rows, dtype=float)
+
+def profile_describe_categorical(profile):
+    rows = ["count", "n_unique", "top", "freq_top", "n_missing", "approximate"]
+    cols = [c for c,t in profile["types"].items() if t!="numeric"]
+    return pd.DataFrame({c: [profile["stats"][c].get(r) for r in rows] for c in cols}, index=rows, dtype=object)
+
+def profile_correlation_with_target(profile, target_col):
+    corr = profile_correlation(profile)
+    if target_col not in corr.columns:
+        return None
+    corrs = {c: (None if pd.isna(v) else float(v)) for c, v in corr[target_col].items() if c != target_col}
+    sorted_corr = sorted(corrs.items(), key=lambda x: abs(x[1]) if x[1] is not None else 0, reverse=True)
+    return sorted_corr
+
+# --- Time windows ---
+# Rows are sorted once by time and cumulative sums of the target (fraud) and
+# value (Amount) columns are kept, so any window [start, end) is answered with
+# two binary searches. New batches are merged in; only the prefix sums after
+# the earliest new timestamp are recomputed.
+TIME_UNITS = {"s": 1, "segundo": 1, "min": 60, "minuto": 60, "h": 3600, "hora": 3600, "dia": 86400}
+
+class TimeWindowIndex:
+    def __init__(self, time_col, target_col=None, positive=None, value_col=None):
+        self.time_col = time_col
+        self.target_col = target_col
+        self.positive = positive
+        self.value_col = value_col
+        self.is_datetime = False
+        self.times = np.empty(0, dtype=np.float64)
+        # prefix sums, one element longer than times
+        self._cy = np.zeros(1)
+        self._cv = np.zeros(1)
+        self._cc = np.zeros(1, dtype=np.int64)
+
+    def _frame_arrays(self, df):
+        s = df[self.time_col]
+        if pd.api.types.is_numeric_dtype(s):
+            t = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        else:
+            self.is_datetime = True
+            dt = pd.to_datetime(s, errors="coerce")
+            t = np.where(dt.isna(), np.nan, dt.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9)
+        y = np.zeros(len(df))
+        if self.target_col is not None:
+            y = (df[self.target_col].astype(str) == self.positive).to_numpy(dtype=np.float64)
+        v = np.full(len(df), np.nan)
+        if self.value_col is not None:
+            v = df[self.value_col].to_numpy(dtype=np.float64, na_value=np.nan)
+        keep = ~np.isnan(t)
+        return t[keep], y[keep], v[keep]
+
+    def append(self, df):
+        t, y, v = self._frame_arrays(df)
+        if len(t) == 0:
+            return self
+        order = np.argsort(t, kind="stable")
+        t, y, v = t[order], y[order], v[order]
+        c = (~np.isnan(v)).astype(np.int64)
+        v = np.nan_to_num(v, nan=0.0)
+        # rows after p must move or be re-accumulated; p == len(times) for in-order batches
+        p = int(np.searchsorted(self.times, t[0], side="right"))
+        tail_t = self.times[p:]
+        pos = np.searchsorted(tail_t, t, side="right")
+        merged_t = np.insert(tail_t, pos, t)
+        merged_y = np.insert(np.diff(self._cy[p:]), pos, y)
+        merged_v = np.insert(np.diff(self._cv[p:]), pos, v)
+        merged_c = np.insert(np.diff(self._cc[p:]), pos, c)
+        self.times = np.concatenate([self.times[:p], merged_t])
+        self._cy = np.concatenate([self._cy[:p+1], self._cy[p] + np.cumsum(merged_y)])
+        self._cv = np.concatenate([self._cv[:p+1], self._cv[p] + np.cumsum(merged_v)])
+        self._cc = np.concatenate([self._cc[:p+1], self._cc[p] + np.cumsum(merged_c)])
+        return self
+
+    @property
+    def start(self):
+        return float(self.times[0]) if len(self.times) else 0.0
+
+    @property
+    def end(self):
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def _summaries(self, starts, ends):
+        i = np.searchsorted(self.times, starts, side="left")
+        j = np.maximum(np.searchsorted(self.times, ends, side="left"), i)
+        n = j - i
+        positives = self._cy[j] - self._cy[i]
+        n_values = self._cc[j] - self._cc[i]
+        totals = self._cv[j] - self._cv[i]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rates = np.where(n > 0, positives / n * 100, np.nan)
+            means = np.where(n_values > 0, totals / n_values, np.nan)
+        windows = []
+        for k in range(len(starts)):
+            w = {"start": self._label(starts[k]), "end": self._label(ends[k]), "count": int(n[k])}
+            if self.target_col is not None:
+                w["positives"] = int(round(positives[k]))
+                w["rate"] = None if np.isnan(rates[k]) else float(rates[k])
+            if self.value_col is not None:
+                w["mean"] = None if np.isnan(means[k]) else float(means[k])
+            windows.append(w)
+        return windows
+
+    def _label(self, t):
+        return pd.to_datetime(t, unit="s").isoformat() if self.is_datetime else float(t)
+
+    def query(self, start, end):
+        # offsets in seconds from the first timestamp
+        return self._summaries(np.array([self.start + start]), np.array([self.start + end]))[0]
+
+    def bucket_width(self, width, max_buckets=MAX_TIME_BUCKETS):
+        # smallest multiple of the requested width that keeps at most max_buckets
+        needed = (self.end - self.start) / max_buckets
+        if width >= needed:
+            return width
+        return math.ceil(needed / width) * width
+
+    def buckets(self, width):
+        width = self.bucket_width(width)
+        n_buckets = int((self.end - self.start) // width) + 1
+        starts = self.start + width * np.arange(n_buckets)
+        return self._summaries(starts, starts + width)
+
+_time_index_cache = OrderedDict()
+
+def find_time_column(profile):
+    datetime_cols = [c for c,t in profile["types"].items() if t=="datetime"]
+    if datetime_cols:
+        return datetime_cols[0]
+    return find_target_column(profile_numeric_cols(profile), ("time",))
+
+def get_time_index(df, profile):
+    time_col = find_time_column(profile)
+    if time_col is None:
+        return None
+    key = (profile["fingerprint"], time_col)
+    if key not in _time_index_cache:
+        balance = profile["class_balance"]
+        target, positive = None, None
+        if balance is not None:
+            target = balance["column"]
+            positive = min(balance["counts"], key=balance["counts"].get)
+        value_col = find_target_column(profile_numeric_cols(profile), ("amount",))
+        _time_index_cache[key] = TimeWindowIndex(time_col, target, positive, value_col).append(df)
+        while len(_time_index_cache) > TIME_INDEX_CACHE_SIZE:
+            _time_index_cache.popitem(last=False)
+    return _time_index_cache[key]
+
+def parse_time_window(q):
+    # "entre 10 e 20 horas" -> (36000, 72000); "por minuto" -> bucket width 60
+    unit = r"(segundos?|s|minutos?|min|horas?|h|dias?)\b"
+    m = re.search(r"entre\s+(\d+(?:[.,]\d+)?)\s*(?:" + unit + r")?\s*(?:e|a|até)\s*(\d+(?:[.,]\d+)?)\s*" + unit, q)
+    if m:
+        end_factor = TIME_UNITS[m.group(4).rstrip("s") or "s"]
+        start_factor = TIME_UNITS[m.group(2).rstrip("s") or "s"] if m.group(2) else end_factor
+        start = float(m.group(1).replace(",", ".")) * start_factor
+        end = float(m.group(3).replace(",", ".")) * end_factor
+        return "window", (min(start, end), max(start, end))
+    m = re.search(r"(?:por|a cada|cada)\s+" + unit, q)
+    if m:
+        return "buckets", TIME_UNITS[m.group(1).rstrip("s") or "s"]
+    return "buckets", TIME_UNITS["hora"]
+
 # --- High-level query processor (improved) ---
-def answer_question(df, question_text):
+def answer_question(df, question_text, profile=None):
     q = question_text.lower().strip()
-    types = detect_column_types(df)
-    numeric_cols = [c for c,t in types.items() if t=="numeric"]
+    if profile is None:
+        profile = get_profile(df)
+    fingerprint = profile["fingerprint"]
+    types = profile["types"]
+    numeric_cols = profile_numeric_cols(profile)
     
     # Pergunta 1: Tipos de dados
     if any(word in q for word in ["tipos", "tipo de dado", "tipos de dados", "categorias"]):
         ans = types
-        add_memory_entry(question_text, "Detected column types.", [])
+        add_memory_entry(question_text, "Detected column types.", [], fingerprint, "types")
         return {"answer": ans, "type": "types"}
     
+    # Janelas de tempo (antes de taxa/intervalo: "taxa de fraude por hora")
+    if (any(word in q for word in ["por hora", "por minuto", "por dia", "por segundo", "janela", "ao longo do tempo", "temporal", "per hour"])
+            or re.search(r"entre\s+\d.*\b(segundos?|minutos?|min|horas?|h|dias?)\b", q)):
+        index = get_time_index(df, profile)
+        if index is not None:
+            kind, spec = parse_time_window(q)
+            if kind == "window":
+                windows = [index.query(*spec)]
+                width = spec[1] - spec[0]
+            else:
+                width = index.bucket_width(spec)
+                windows = index.buckets(width)
+            summary = f"Aggregated {len(windows)} time window(s) of {width:g}s over {index.time_col}."
+            if kind == "buckets" and width != spec:
+                summary += f" Requested width {spec:g}s was widened to stay within {MAX_TIME_BUCKETS} windows."
+            add_memory_entry(question_text, summary, [], fingerprint, "time_window")
+            return {"answer": {"column": index.time_col, "target": index.target_col, "value_column": index.value_col,
+                               "width": width, "requested_width": spec if kind == "buckets" else width,
+                               "windows": windows}, "type": "time_window"}
+    
     # Pergunta 2: Distribuição/Histograma
     if any(word in q for word in ["distribuição", "histogram", "histograma", "frequência"]):
         for c in df.columns:
             if c.lower() in q:
                 path = os.path.join(OUTPUT_DIR, f"hist_{c}.png")
-                plot_histogram(df, c, save_as=path)
-                add_memory_entry(question_text, f"Histogram generated for {c}.", [path])
+                if profile["histograms"].get(c):
+                    plot_histogram_bins(profile["histograms"][c], c, save_as=path)
+                else:
+                    plot_histogram(df, c, save_as=path)
+                add_memory_entry(question_text, f"Histogram generated for {c}.", [path], fingerprint, "histogram")
                 return {"answer": f"Histogram of {c} generated.", "artifact": path, "type": "histogram"}
-        if numeric_cols:
-            var_col = df[numeric_cols].var().idxmax()
+        variances = {c: profile["stats"][c]["var"] for c in numeric_cols if profile["stats"][c]["var"] is not None}
+        if variances:
+            var_col = max(variances, key=variances.get)
             path = os.path.join(OUTPUT_DIR, f"hist_{var_col}.png")
-            plot_histogram(df, var_col, save_as=path)
-            add_memory_entry(question_text, f"Histogram generated for {var_col}.", [path])
+            plot_histogram_bins(profile["histograms"][var_col], var_col, save_as=path)
+            add_memory_entry(question_text, f"Histogram generated for {var_col}.", [path], fingerprint, "histogram")
             return {"answer": f"Histogram of {var_col} generated.", "artifact": path, "type": "histogram"}
     
     # Pergunta 3: Intervalo/Min/Max
     if any(word in q for word in ["intervalo", "mínimo", "máximo", "range", "min", "max"]):
-        stats = descriptive_stats(df, numeric_cols)
+        stats = profile["stats"]
         summary = {c: {"min": stats[c]["min"], "max": stats[c]["max"]} for c in numeric_cols}
-        add_memory_entry(question_text, "Returned min/max for numeric columns.", [])
+        add_memory_entry(question_text, "Returned min/max for numeric columns.", [], fingerprint, "range")
         return {"answer": summary, "type": "range"}
     
     # Média/Mediana
     if any(word in q for word in ["média", "mediana", "tendência central", "mean", "median"]):
-        stats = descriptive_stats(df, numeric_cols)
+        stats = profile["stats"]
         summary = {c: {"mean": stats[c]["mean"], "median": stats[c]["median"]} for c in numeric_cols}
-        add_memory_entry(question_text, "Returned mean/median for numeric columns.", [])
+        add_memory_entry(question_text, "Returned mean/median for numeric columns.", [], fingerprint, "central_tendency")
         return {"answer": summary, "type": "central_tendency"}
     
     # Variabilidade
     if any(word in q for word in ["variabilidade", "desvio", "variância", "std", "var"]):
-        stats = descriptive_stats(df, numeric_cols)
+        stats = profile["stats"]
         summary = {c: {"std": stats[c]["std"], "var": stats[c]["var"]} for c in numeric_cols}
-        add_memory_entry(question_text, "Returned std/var for numeric columns.", [])
+        add_memory_entry(question_text, "Returned std/var for numeric columns.", [], fingerprint, "variability")
         return {"answer": summary, "type": "variability"}
     
     # Taxa de fraude ou classe
     if any(word in q for word in ["taxa", "proporção", "percentual", "fraude", "class"]):
-        target_candidates = [c for c in df.columns if "class" in c.lower() or "fraud" in c.lower()]
-        if target_candidates:
-            target = target_candidates[0]
-            counts = df[target].value_counts()
-            total = len(df)
-            proportions = (counts / total * 100).to_dict()
-            add_memory_entry(question_text, f"Calculated proportion for {target}.", [])
-            return {"answer": {"column": target, "counts": counts.to_dict(), "proportions": proportions, "total": total}, "type": "proportion"}
+        balance = profile["class_balance"]
+        if balance is not None:
+            add_memory_entry(question_text, f"Calculated proportion for {balance['column']}.", [], fingerprint, "proportion")
+            return {"answer": balance, "type": "proportion"}
     
     # Outliers
     if any(word in q for word in ["outliers", "valores atípicos", "anomalias", "atípico"]):
         iqr_outliers = {}
         for c in numeric_cols:
-            mask, bounds = detect_outliers_iqr(df[c].dropna())
+            mask, bounds = detect_outliers_iqr(df[c], profile["stats"][c]["25%"], profile["stats"][c]["75%"])
             n_out = int(mask.sum()) if hasattr(mask,'sum') else 0
             iqr_outliers[c] = {"n_outliers": n_out, "bounds": bounds}
         if len(numeric_cols) >= 2:
-            iso_mask = detect_outliers_isolationforest(df, numeric_cols, contamination=0.005)
+            iso_mask = detect_outliers_isolationforest(df, numeric_cols, contamination=0.005, fingerprint=fingerprint)
             n_iso = int(iso_mask.sum())
         else:
             n_iso = 0
-        add_memory_entry(question_text, f"Detected outliers via IQR and IsolationForest.", [])
+        add_memory_entry(question_text, f"Detected outliers via IQR and IsolationForest.", [], fingerprint, "outliers")
         return {"answer": {"iqr_summary": iqr_outliers, "isolation_forest_outliers": n_iso}, "type": "outliers"}
     
     # Correlação
     if any(word in q for word in ["correlação", "relacionadas", "influência", "correlation"]):
-        target_candidates = [c for c in df.columns if "class" in c.lower() or "target" in c.lower() or "fraud" in c.lower()]
-        if target_candidates:
-            target = target_candidates[0]
-            corrs = correlation_with_target(df, target)
+        target = find_target_column(df.columns, ("class", "target", "fraud"))
+        corr = profile_correlation(profile)
+        if target is not None and target in corr.columns:
+            corrs = profile_correlation_with_target(profile, target)
             path = os.path.join(OUTPUT_DIR, "correlation_heatmap.png")
-            plot_correlation_heatmap(df, numeric_cols, save_as=path)
-            add_memory_entry(question_text, f"Computed correlation with target {target}.", [path])
+            plot_correlation_heatmap(df, numeric_cols, save_as=path, corr=corr)
+            add_memory_entry(question_text, f"Computed correlation with target {target}.", [path], fingerprint, "correlation")
             return {"answer": {"target": target, "correlations": corrs[:10]}, "artifact": path, "type": "correlation"}
         else:
             path = os.path.join(OUTPUT_DIR, "correlation_heatmap.png")
-            plot_correlation_heatmap(df, numeric_cols, save_as=path)
-            add_memory_entry(question_text, "Generated correlation heatmap.", [path])
+            plot_correlation_heatmap(df, numeric_cols, save_as=path, corr=corr)
+            add_memory_entry(question_text, "Generated correlation heatmap.", [path], fingerprint, "correlation")
             return {"answer": "Correlation heatmap generated.", "artifact": path, "type": "correlation"}
     
     # Conclusões
     if any(word in q for word in ["conclusão", "conclusões", "insights", "resumo final"]):
-        mem = load_memory()
-        all_summaries = [entry["summary"] for entry in mem["analyses"]]
-        conclusion = f"Baseado em {len(all_summaries)} análises realizadas: " + "; ".join(all_summaries[:5])
+        n_analyses = count_memory(dataset=fingerprint)
+        summaries = [entry["summary"] for entry in conclusion_entries(fingerprint)]
+        conclusion = f"Baseado em {n_analyses} análises realizadas: " + "; ".join(summaries)
         return {"answer": conclusion, "type": "conclusion"}
     
     # fallback
-    add_memory_entry(question_text, "Question not matched; returning basic summary.", [])
-    basic = {"rows": int(len(df)), "columns": len(df.columns), "columns_list": df.columns.tolist()}
+    add_memory_entry(question_text, "Question not matched; returning basic summary.", [], fingerprint, "basic")
+    basic = {"rows": profile["rows"], "columns": len(profile["columns"]), "columns_list": profile["columns"]}
     return {"answer": f"Pergunta não reconhecida. Resumo básico: {basic}", "type": "basic"}
\ No newline at end of file
@@ -1,8 +1,11 @@
 # app_streamlit.py
 import streamlit as st
-from agent_core import (load_csv, detect_column_types, descriptive_stats, 
+from agent_core import (load_csv, 
                         plot_histogram, plot_correlation_heatmap, answer_question, 
-                        OUTPUT_DIR, load_memory)
+                        OUTPUT_DIR, get_profile, profile_describe, profile_describe_categorical,
+                        profile_numeric_cols, profile_correlation, plot_histogram_bins,
+                        list_data_files, resolve_data_file, DATA_DIR,
+                        search_memory, count_memory, memory_intents, clear_memory)
 import os
 import pandas as pd
 
@@ -19,9 +22,25 @@ st.markdown("""
 st.markdown('<p class="main-title">🤖 Agente Autônomo de EDA - Análise Exploratória de Dados</p>', unsafe_allow_html=True)
 st.markdown("**Carregue qualquer arquivo CSV e faça perguntas sobre os dados**")
 
-uploaded_file = st.file_uploader("📁 Escolha um arquivo CSV", type=["csv"])
+# Origem dos dados: upload ou diretório do servidor (DATA_DIR)
+data_files = list_data_files()
+source = "📁 Upload"
+if data_files:
+    source = st.radio("Origem dos dados:", ["📁 Upload", "🗄️ Diretório do servidor"], horizontal=True)
 
-if uploaded_file is None:
+data_source = None
+if source == "📁 Upload":
+    uploaded_file = st.file_uploader("📁 Escolha um arquivo CSV (também aceita .gz, .bz2 e .zst)",
+                                     type=["csv", "gz", "bz2", "zst"])
+    if uploaded_file is not None:
+        data_source, source_id = uploaded_file, f"upload_{uploaded_file.file_id}"
+else:
+    name = st.selectbox(f"Arquivo em `{DATA_DIR}`:", data_files)
+    path = resolve_data_file(name)
+    info = os.stat(path)
+    data_source, source_id = path, f"server_{name}_{info.st_mtime_ns}_{info.st_size}"
+
+if data_source is None:
     st.info("👆 Faça upload de um arquivo CSV para começar a análise")
     st.markdown("---")
     st.subheader("📋 Exemplos de perguntas que você pode fazer:")
@@ -33,10 +52,21 @@ if uploaded_file is None:
     - Existe correlação entre as variáveis?
     - Detecte outliers nos dados
     - Qual a taxa de fraude? (para datasets com classe)
+    - Qual a taxa de fraude por hora? / Quantas transações entre 10 e 20 horas?
     - Quais são as conclusões do agente?
     """)
 else:
-    df = load_csv(uploaded_file)
+    # Dados e perfil: carregados uma vez por arquivo e mantidos entre reruns
+    if st.session_state.get("source_id") != source_id:
+        st.session_state.pop("df", None)
+        bar = st.progress(0.0, text="Carregando dados...")
+        df = load_csv(data_source, progress=lambda f: bar.progress(min(f, 1.0), text=f"Carregando dados... {f:.0%}"))
+        bar.empty()
+        with st.spinner("Gerando perfil do dataset..."):
+            profile = get_profile(df)
+        st.session_state.update(source_id=source_id, df=df, profile=profile)
+    df = st.session_state["df"]
+    profile = st.session_state["profile"]
     
     # Sidebar com info rápida
     st.sidebar.header("📊 Visão Geral")
@@ -45,7 +75,7 @@ else:
     st.sidebar.metric("Células", f"{len(df) * len(df.columns):,}")
     
     if st.sidebar.button("🔍 Detectar Tipos de Colunas"):
-        types = detect_column_types(df)
+        types = profile["types"]
         st.sidebar.write("**Tipos detectados:**")
         for col, tipo in types.items():
             st.sidebar.write(f"• {col}: `{tipo}`")
@@ -58,7 +88,12 @@ else:
         st.dataframe(df.head(100), use_container_width=True)
         
         st.subheader("📈 Estatísticas Descritivas")
-        st.dataframe(df.describe(), use_container_width=True)
+        st.dataframe(profile_describe(profile), use_container_width=True)
+        
+        cat_stats = profile_describe_categorical(profile)
+        if not cat_stats.empty:
+            st.subheader("🔤 Colunas Categóricas e de Texto")
+            st.dataframe(cat_stats.astype(str), use_container_width=True)
     
     with tab2:
         st.header("💬 Faça perguntas ao agente")
@@ -74,7 +109,7 @@ else:
         
         if perguntar_btn and q:
             with st.spinner("Processando..."):
-                resp = answer_question(df, q)
+                resp = answer_question(df, q, profile)
                 
                 st.success("✅ Resposta do agente:")
                 
@@ -96,6 +131,19 @@ else:
                             st.write(f"  • {col}: {corr:.4f}")
                     else:
                         st.write(ans)
+                elif resp.get("type") == "time_window":
+                    ans = resp.get("answer")
+                    st.write(f"**Coluna de tempo:** {ans['column']}")
+                    st.write(f"**Largura da janela:** {ans['width']:,.0f} s")
+                    if ans['width'] != ans['requested_width']:
+                        st.info(f"Janela de {ans['requested_width']:,.0f} s ampliada para {ans['width']:,.0f} s "
+                                "para limitar o número de janelas.")
+                    windows = pd.DataFrame(ans['windows'])
+                    windows = windows.rename(columns={"start": "início", "end": "fim", "count": "registros",
+                                                      "positives": f"{ans['target']} (positivos)",
+                                                      "rate": f"taxa de {ans['target']} (%)",
+                                                      "mean": f"média de {ans['value_column']}"})
+                    st.dataframe(windows, use_container_width=True)
                 elif resp.get("type") == "outliers":
                     ans = resp.get("answer")
                     st.write("**Outliers detectados (método IQR):**")
@@ -111,7 +159,7 @@ else:
     with tab3:
         st.header("🛠️ Ferramentas Rápidas")
         
-        numeric_cols = df.select_dtypes(include=['float64', 'int64']).columns.tolist()
+        numeric_cols = profile_numeric_cols(profile)
         
         if numeric_cols:
             col = st.selectbox("Selecione uma coluna numérica:", numeric_cols)
@@ -121,7 +169,10 @@ else:
             with col1:
                 if st.button("📊 Gerar Histograma"):
                     hist_path = os.path.join(OUTPUT_DIR, f"hist_{col}.png")
-                    plot_histogram(df, col, save_as=hist_path)
+                    if profile["histograms"].get(col):
+                        plot_histogram_bins(profile["histograms"][col], col, save_as=hist_path)
+                    else:
+                        plot_histogram(df, col, save_as=hist_path)
                     st.image(hist_path, use_container_width=True)
             
             with col2:
@@ -138,16 +189,31 @@ else:
                 st.warning("⚠️ São necessárias pelo menos 2 colunas numéricas para calcular correlação.")
             else:
                 path = os.path.join(OUTPUT_DIR, "corr_heatmap.png")
-                plot_correlation_heatmap(df, numeric_cols, save_as=path)
+                plot_correlation_heatmap(df, numeric_cols, save_as=path, corr=profile_correlation(profile))
                 st.image(path, use_container_width=True)
     
     with tab4:
         st.header("🧠 Memória do Agente")
-        st.markdown("Histórico de análises realizadas nesta sessão:")
+        st.markdown("Histórico de análises realizadas:")
+        
+        page_size = 10
+        fcol1, fcol2, fcol3 = st.columns([3, 2, 2])
+        with fcol1:
+            mem_text = st.text_input("🔎 Buscar na memória:", placeholder="Ex: fraude")
+        with fcol2:
+            only_dataset = st.checkbox("Apenas este dataset", value=True)
+        mem_dataset = profile["fingerprint"] if only_dataset else None
+        with fcol3:
+            mem_intent = st.selectbox("Tipo de análise:", ["Todos"] + memory_intents(mem_dataset))
+        mem_intent = None if mem_intent == "Todos" else mem_intent
         
-        mem = load_memory()
-        if mem["analyses"]:
-            for i, entry in enumerate(reversed(mem["analyses"][-10:]), 1):
+        n_entries = count_memory(dataset=mem_dataset, intent=mem_intent, text=mem_text)
+        if n_entries:
+            n_pages = (n_entries - 1) // page_size + 1
+            page = st.number_input(f"Página (de {n_pages}):", min_value=1, max_value=n_pages, value=1)
+            entries = search_memory(dataset=mem_dataset, intent=mem_intent, text=mem_text,
+                                    limit=page_size, offset=(page - 1) * page_size)
+            for i, entry in enumerate(entries, (page - 1) * page_size + 1):
                 with st.expander(f"📌 Análise {i}: {entry['question'][:50]}..."):
                     st.write(f"**Pergunta:** {entry['question']}")
                     st.write(f"**Resumo:** {entry['summary']}")
@@ -158,9 +224,7 @@ else:
             st.info("Nenhuma análise realizada ainda. Faça perguntas na aba 'Perguntas ao Agente'.")
         
         if st.button("🗑️ Limpar Memória"):
-            import json
-            with open("memory.json", "w") as f:
-                json.dump({"analyses": []}, f)
+            clear_memory()
             st.success("Memória limpa!")
             st.rerun()
 
@@ -0,0 +1,206 @@
+# test_agent_core.py
+import gzip
+import io
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import agent_core
+from agent_core import load_csv, get_profile, profile_describe
+
+
+def _mixed_csv(n=4000):
+    # "mixed" looks numeric in the first blocks and textual in the last ones
+    df = pd.DataFrame({
+        "mixed": [str(i) if i < 2700 else f"x{i}" for i in range(n)],
+        "i": range(n),
+        "f": [np.nan if i % 500 == 0 and i > 3000 else 1.5 * i for i in range(n)],
+        "late_nan": [i if i < 3500 else None for i in range(n)],
+    })
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def test_multi_block_load_matches_single_read_csv(tmp_path):
+    path = tmp_path / "mixed.csv"
+    path.write_bytes(_mixed_csv())
+    expected = pd.read_csv(path)
+    for workers in (1, 3):
+        df = load_csv(str(path), chunk_bytes=20000, workers=workers)
+        pd.testing.assert_frame_equal(df, expected)
+
+
+def test_multi_block_load_of_compressed_buffer():
+    raw = _mixed_csv()
+    expected = pd.read_csv(io.BytesIO(raw))
+    df = load_csv(io.BytesIO(gzip.compress(raw)), chunk_bytes=20000, workers=2)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_multi_block_load_with_quoted_newlines():
+    rows = [f'{i},"line one\nline ""two"" {i}",{i * 2}' for i in range(300)]
+    raw = ("id,text,n\n" + "\n".join(rows) + "\n").encode("utf-8")
+    expected = pd.read_csv(io.BytesIO(raw))
+    for workers in (1, 2):
+        df = load_csv(io.BytesIO(raw), chunk_bytes=200, workers=workers)
+        pd.testing.assert_frame_equal(df, expected)
+
+
+def test_multi_block_load_keeps_bool_column_with_blanks_as_object():
+    flags = ["True", "False"] * 1500 + ["True", ""] * 500
+    raw = ("i,flag\n" + "\n".join(f"{i},{f}" for i, f in enumerate(flags)) + "\n").encode("utf-8")
+    expected = pd.read_csv(io.BytesIO(raw))
+    df = load_csv(io.BytesIO(raw), chunk_bytes=2000, workers=2)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_profile_of_bool_empty_datetime_and_category_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_core, "PROFILE_DIR", str(tmp_path))
+    df = pd.DataFrame({
+        "flag": [True, False, True, True],
+        "empty": [np.nan] * 4,
+        "when": ["2024-01-01", "2024-01-02", None, "2024-01-04"],
+        "cat": pd.Categorical(["a", "b", "a", "a"]),
+        "x": [1, 2, 3, 4],
+    })
+    profile = get_profile(df)
+    assert profile["types"]["flag"] == "numeric"
+    assert profile["types"]["when"] == "datetime"
+    assert profile["stats"]["flag"]["mean"] == 0.75
+    assert profile["stats"]["cat"]["top"] == "a"
+    assert profile["stats"]["cat"]["freq_top"] == 3
+    assert profile["histograms"]["empty"] is None
+    # the second call loads the saved profile (NaN-safe comparison via JSON)
+    assert json.dumps(get_profile(df), default=str) == json.dumps(profile, default=str)
+    assert list(profile_describe(profile).columns) == ["flag", "empty", "x"]
+
+
+def test_profile_of_loaded_bool_column(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_core, "PROFILE_DIR", str(tmp_path))
+    df = load_csv(io.BytesIO(b"a,flag\n1,True\n2,False\n"))
+    assert get_profile(df)["stats"]["flag"]["max"] == 1.0
+
+
+def _use_tmp_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(agent_core, "MEMORY_FILE", str(tmp_path / "memory.json"))
+    monkeypatch.setattr(agent_core, "MEMORY_INDEX", str(tmp_path / "memory_index.sqlite"))
+
+
+def _entry(i, question, summary, dataset, intent):
+    return {"timestamp": f"2025-01-01T00:00:{i:02d}Z", "question": question, "summary": summary,
+            "artifacts": [], "dataset": dataset, "type": intent}
+
+
+def test_memory_index_rebuilds_after_external_edit(tmp_path, monkeypatch):
+    _use_tmp_memory(tmp_path, monkeypatch)
+    agent_core.add_memory_entry("tipos?", "Detected column types.", [], "ds", "types")
+    assert agent_core.count_memory() == 1
+    entries = [_entry(i, f"pergunta {i}", "resumo", "ds", "types") for i in range(3)]
+    with open(agent_core.MEMORY_FILE, "w", encoding="utf-8") as f:
+        json.dump({"analyses": entries}, f)
+    assert agent_core.count_memory() == 3
+    assert agent_core.search_memory(limit=1)[0]["question"] == "pergunta 2"
+
+
+def test_conclusion_entries_newest_per_type_for_one_dataset(tmp_path, monkeypatch):
+    _use_tmp_memory(tmp_path, monkeypatch)
+    agent_core.save_memory({"analyses": [
+        _entry(1, "q", "old histogram", "ds", "histogram"),
+        _entry(2, "q", "types", "ds", "types"),
+        _entry(3, "q", "new histogram", "ds", "histogram"),
+        _entry(4, "q", "basic", "ds", "basic"),
+        _entry(5, "q", "untyped", "ds", None),
+        _entry(6, "q", "other dataset", "other", "range"),
+    ]})
+    summaries = [e["summary"] for e in agent_core.conclusion_entries("ds")]
+    assert summaries == ["new histogram", "types"]
+
+
+def test_search_memory_text_intent_and_offset(tmp_path, monkeypatch):
+    _use_tmp_memory(tmp_path, monkeypatch)
+    entries = []
+    for i in range(30):
+        intent = "proportion" if i % 2 else "types"
+        entries.append(_entry(i, f"taxa de fraude {i}", f"resumo {i}", "ds", intent))
+    entries.append(_entry(59, "outra pergunta", "resumo", "ds", "proportion"))
+    agent_core.save_memory({"analyses": entries})
+    assert agent_core.count_memory(text="fraude", intent="proportion") == 15
+    page = agent_core.search_memory(text="fraude", intent="proportion", limit=10, offset=10)
+    assert [e["question"] for e in page] == [f"taxa de fraude {i}" for i in (9, 7, 5, 3, 1)]
+
+
+def test_hll_distinct_count_is_close_to_exact():
+    values = np.random.default_rng(0).integers(0, 200_000, 500_000).astype(str).astype(object)
+    exact = len(pd.unique(values))
+    estimate = agent_core.hll_distinct_count(pd.util.hash_array(values, categorize=False))
+    assert abs(estimate - exact) / exact < 0.03
+
+
+def test_misra_gries_top_k_matches_exact_counts():
+    values = np.random.default_rng(1).zipf(1.3, 300_000).astype(str).astype(object)
+    hashes = pd.util.hash_array(values, categorize=False)
+    summary = agent_core.misra_gries(hashes, capacity=100, chunk=50_000)
+    exact = pd.Series(values).value_counts()
+    top = summary.sort_values("count", ascending=False).head(5)
+    assert [values[p] for p in top["pos"]] == exact.index[:5].tolist()
+    bound = len(values) / 101
+    for p, c in zip(top["pos"], top["count"]):
+        assert exact[values[p]] - bound <= c <= exact[values[p]]
+
+
+def test_sketch_summary_agrees_with_encoded_summary(monkeypatch):
+    monkeypatch.setattr(agent_core, "SKETCH_SLICE", 40_000)
+    rng = np.random.default_rng(2)
+    s = pd.Series(np.char.add("m", rng.zipf(1.3, 200_000).astype(str)).astype(object))
+    s[rng.random(len(s)) < 0.01] = None
+    exact, _ = agent_core._encoded_summary(s, 5)
+    approx, _ = agent_core._sketch_summary(s, 5)
+    assert approx["approximate"] and approx["count"] == exact["count"]
+    assert approx["n_missing"] == exact["n_missing"]
+    assert approx["top"] == exact["top"]
+    assert [v for v, _ in approx["top_k"]] == [v for v, _ in exact["top_k"]]
+    assert abs(approx["n_unique"] - exact["n_unique"]) / exact["n_unique"] < 0.03
+
+
+def test_correlation_matrix_matches_dataframe_corr():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"a": rng.normal(size=500), "b": rng.normal(size=500), "c": 0.1, "flag": rng.random(500) < 0.3})
+    df["d"] = df["a"] * 2 + rng.normal(size=500)
+    cols = ["a", "b", "c", "flag", "d"]
+    pd.testing.assert_frame_equal(agent_core.correlation_matrix(df, cols), df[cols].corr(), atol=1e-10)
+    df.loc[3, "b"] = np.nan
+    pd.testing.assert_frame_equal(agent_core.correlation_matrix(df, cols), df[cols].corr())
+
+
+def _transactions(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({"Time": rng.uniform(0, 172800, n), "Amount": rng.exponential(80, n),
+                         "Class": (rng.random(n) < 0.05).astype(int)})
+
+
+def test_time_index_incremental_append_matches_single_build():
+    a, b = _transactions(3000, 4), _transactions(2000, 5)  # b interleaves with a
+    incremental = agent_core.TimeWindowIndex("Time", "Class", "1", "Amount").append(a).append(b)
+    single = agent_core.TimeWindowIndex("Time", "Class", "1", "Amount").append(pd.concat([a, b]))
+    np.testing.assert_array_equal(incremental.times, single.times)
+    pd.testing.assert_frame_equal(pd.DataFrame(incremental.buckets(3600)), pd.DataFrame(single.buckets(3600)))
+
+
+def test_time_window_query_matches_brute_force():
+    df = _transactions(5000, 6)
+    index = agent_core.TimeWindowIndex("Time", "Class", "1", "Amount").append(df)
+    for start, end in [(0, 3600), (1800, 7200), (36000, 72000), (100000, 100000)]:
+        rows = df[(df.Time >= index.start + start) & (df.Time < index.start + end)]
+        window = index.query(start, end)
+        assert window["count"] == len(rows)
+        assert window["positives"] == int(rows.Class.sum())
+        if len(rows):
+            assert window["mean"] == pytest.approx(rows.Amount.mean())
+
+
+def test_time_buckets_widen_by_multiples_of_the_requested_width():
+    index = agent_core.TimeWindowIndex("Time").append(_transactions(5000, 7))
+    assert index.bucket_width(60) == 180
+    assert len(index.buckets(60)) <= agent_core.MAX_TIME_BUCKETS
+    assert index.bucket_width(3600) == 3600